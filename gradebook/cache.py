@@ -0,0 +1,147 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Roughly estimate the memory footprint of a cached value in bytes.
+
+    Lists and tuples are walked one level deep and objects contribute
+    their instance attributes, which is enough for an Enrollment and
+    its grade list.
+
+    Args:
+        value: Object to measure
+
+    Returns:
+        Estimated size in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += sys.getsizeof(value.__dict__)
+        for attr in value.__dict__.values():
+            size += estimate_size(attr) if isinstance(attr, (list, tuple)) else sys.getsizeof(attr)
+    return size
+
+
+class LRUCache:
+    """Least-recently-used cache with entry/byte budgets and write-back of dirty entries."""
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("Cache entry budget must be positive")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("Cache byte budget must be positive")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._on_evict = on_evict
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._dirty = set()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value and mark it most recently used, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, dirty: bool = False):
+        """
+        Insert or replace a value, evicting least recently used entries over budget.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            dirty: Whether the value must be written back before it is dropped
+        """
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        size = self._sizeof(value)
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+        if dirty:
+            self._dirty.add(key)
+        self._evict_over_budget()
+
+    def mark_dirty(self, key: Hashable):
+        """
+        Flag a cached value as modified and refresh its size.
+
+        Raises:
+            KeyError: If the key is not cached
+        """
+        value, size = self._entries[key]
+        new_size = self._sizeof(value)
+        self._entries[key] = (value, new_size)
+        self._entries.move_to_end(key)
+        self.current_bytes += new_size - size
+        self._dirty.add(key)
+        self._evict_over_budget()
+
+    def dirty_items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Yield (key, value) pairs that have not been written back yet."""
+        for key in list(self._dirty):
+            yield key, self._entries[key][0]
+
+    def mark_clean(self, key: Hashable):
+        """Forget that a cached value was modified."""
+        self._dirty.discard(key)
+
+    def clear(self):
+        """Drop all entries without writing them back."""
+        self._entries.clear()
+        self._dirty.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current occupancy."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "writebacks": self.writebacks,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "dirty": len(self._dirty),
+        }
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes is not None and self.current_bytes > self.max_bytes:
+            return True
+        return False
+
+    def _evict_over_budget(self):
+        """Drop least recently used entries, writing back dirty ones, until within budget."""
+        # Always keep the most recent entry so a single oversized value stays usable.
+        while len(self._entries) > 1 and self._over_budget():
+            key, (value, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+            if key in self._dirty:
+                self._dirty.discard(key)
+                if self._on_evict is not None:
+                    self._on_evict(key, value)
+                self.writebacks += 1
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Iterator, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ("student_id", "student_name", "course_code", "course_title", "grade", "course_average")
+EXPORT_FORMATS = ("csv", "jsonl")
+CHUNK_SIZE = 1 << 20
+
+GradeRow = Tuple[int, str, str, str, float, float]
+
+
+def iter_grade_rows(service) -> Iterator[GradeRow]:
+    """
+    Yield one flat row per grade, joining enrollments with their student and course.
+
+    Enrollments are streamed from service.list_enrollments(), so only one
+    enrollment is held at a time in memory-bounded mode.
+
+    Args:
+        service: GradebookService to export
+
+    Yields:
+        (student_id, student_name, course_code, course_title, grade, course_average)
+    """
+    for enrollment in service.list_enrollments():
+        if not enrollment.grades:
+            continue
+        student = service._find_student(enrollment.student_id)
+        course = service._find_course(enrollment.course_code)
+        name = student.name if student else ""
+        title = course.title if course else ""
+        average = enrollment.get_average()
+        for grade in enrollment.grades:
+            yield (enrollment.student_id, name, enrollment.course_code, title, grade, average)
+
+
+def write_csv(rows: Iterator[GradeRow], stream: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Write rows as CSV with a header, in chunks of roughly chunk_size characters.
+
+    Returns:
+        Number of rows written
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if buffer.tell() >= chunk_size:
+            stream.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+    stream.write(buffer.getvalue())
+    return count
+
+
+def write_jsonl(rows: Iterator[GradeRow], stream: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Write rows as JSON Lines objects, in chunks of roughly chunk_size characters.
+
+    Returns:
+        Number of rows written
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    lines = []
+    pending = 0
+    count = 0
+    for row in rows:
+        line = encode(dict(zip(EXPORT_FIELDS, row)))
+        lines.append(line)
+        pending += len(line) + 1
+        count += 1
+        if pending >= chunk_size:
+            lines.append("")
+            stream.write("\n".join(lines))
+            lines = []
+            pending = 0
+    if lines:
+        lines.append("")
+        stream.write("\n".join(lines))
+    return count
+
+
+_WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+}
+
+
+def export_grades(service, fmt: str, file_path: Optional[str] = None) -> int:
+    """
+    Stream every grade of the gradebook to a file or stdout.
+
+    Args:
+        service: GradebookService to export
+        fmt: "csv" or "jsonl"
+        file_path: Output file, or None for stdout
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of: {', '.join(EXPORT_FORMATS)}")
+    writer = _WRITERS[fmt]
+    rows = iter_grade_rows(service)
+
+    if file_path is None:
+        count = writer(rows, sys.stdout)
+        sys.stdout.flush()
+    else:
+        path = Path(file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8', newline='', buffering=CHUNK_SIZE) as file:
+            count = writer(rows, file)
+
+    logger.info(f"Exported {count} rows as {fmt} to {file_path or 'stdout'}")
+    return count
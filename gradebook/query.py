@@ -0,0 +1,398 @@
+import operator
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import Enrollment
+
+
+TARGETS = ("students", "courses", "enrollments")
+
+_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:"
+    r"(?P<number>-?\d+(?:\.\d+)?)(?![\w.])"
+    r"|(?P<string>'[^']*'|\"[^\"]*\")"
+    r"|(?P<op>==|!=|<=|>=|=|<|>)"
+    r"|(?P<paren>[()])"
+    r"|(?P<word>[A-Za-z_]\w*)"
+    r")"
+)
+
+
+def _average(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def _enrollment_fields(service) -> Dict[str, Tuple[str, Callable[[Enrollment], Any]]]:
+    """Field name -> (kind, getter) for enrollment queries."""
+    return {
+        "student_id": ("number", lambda e: e.student_id),
+        "course_code": ("code", lambda e: e.course_code),
+        "name": ("text", lambda e: getattr(service._find_student(e.student_id), "name", None)),
+        "title": ("text", lambda e: getattr(service._find_course(e.course_code), "title", None)),
+        "avg": ("number", lambda e: e.get_average()),
+        "count": ("number", lambda e: len(e.grades)),
+        "min": ("number", lambda e: min(e.grades) if e.grades else None),
+        "max": ("number", lambda e: max(e.grades) if e.grades else None),
+    }
+
+
+def _student_fields(service) -> Dict[str, Tuple[str, Callable[[Any], Any]]]:
+    """Field name -> (kind, getter) for student queries."""
+    def gpa(student):
+        return _average([e.get_average() for e in service._student_enrollments(student.id) if e.grades])
+
+    return {
+        "id": ("number", lambda s: s.id),
+        "name": ("text", lambda s: s.name),
+        "avg": ("number", gpa),
+        "gpa": ("number", gpa),
+        "count": ("number", lambda s: len(service._student_enrollments(s.id))),
+    }
+
+
+def _course_fields(service) -> Dict[str, Tuple[str, Callable[[Any], Any]]]:
+    """Field name -> (kind, getter) for course queries."""
+    return {
+        "code": ("code", lambda c: c.code),
+        "title": ("text", lambda c: c.title),
+        "avg": ("number", lambda c: _average(
+            [e.get_average() for e in service._course_enrollments(c.code) if e.grades]
+        )),
+        "count": ("number", lambda c: len(service._course_enrollments(c.code))),
+    }
+
+
+_FIELDS = {
+    "students": _student_fields,
+    "courses": _course_fields,
+    "enrollments": _enrollment_fields,
+}
+
+
+class Comparison:
+    """A single `field op value` test."""
+
+    def __init__(self, field: str, op: str, value: Any):
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def __str__(self):
+        value = repr(self.value) if isinstance(self.value, str) else f"{self.value:g}"
+        return f"{self.field} {self.op} {value}"
+
+
+class BoolOp:
+    """A conjunction or disjunction of sub-expressions."""
+
+    def __init__(self, op: str, operands: List[Any]):
+        self.op = op
+        self.operands = operands
+
+    def __str__(self):
+        return "(" + f" {self.op} ".join(str(o) for o in self.operands) + ")"
+
+
+class Not:
+    """A negated sub-expression."""
+
+    def __init__(self, operand: Any):
+        self.operand = operand
+
+    def __str__(self):
+        return f"not {self.operand}"
+
+
+class _Parser:
+    """Recursive-descent parser for filter expressions."""
+
+    def __init__(self, expression: str):
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+
+    @staticmethod
+    def _tokenize(expression: str) -> List[Tuple[str, str]]:
+        tokens = []
+        pos = 0
+        expression = expression.rstrip()
+        while pos < len(expression):
+            match = _TOKEN_RE.match(expression, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"Unexpected character in query at position {pos}: {expression[pos:]!r}")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            pos = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of query")
+        self.pos += 1
+        return token
+
+    def _keyword(self, word: str) -> bool:
+        token = self._peek()
+        if token and token[0] == "word" and token[1].lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Query expression cannot be empty")
+        node = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token in query: {self._peek()[1]!r}")
+        return node
+
+    def _or(self):
+        operands = [self._and()]
+        while self._keyword("or"):
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else BoolOp("or", operands)
+
+    def _and(self):
+        operands = [self._not()]
+        while self._keyword("and"):
+            operands.append(self._not())
+        return operands[0] if len(operands) == 1 else BoolOp("and", operands)
+
+    def _not(self):
+        if self._keyword("not"):
+            return Not(self._not())
+        return self._primary()
+
+    def _primary(self):
+        kind, text = self._next()
+        if kind == "paren" and text == "(":
+            node = self._or()
+            if self._next() != ("paren", ")"):
+                raise ValueError("Expected ')' in query")
+            return node
+        if kind != "word":
+            raise ValueError(f"Expected a field name in query, got {text!r}")
+        field = text.lower()
+
+        op_kind, op = self._next()
+        if op_kind != "op":
+            raise ValueError(f"Expected a comparison operator after {field!r}, got {op!r}")
+
+        value_kind, value = self._next()
+        if value_kind == "number":
+            return Comparison(field, op, float(value))
+        if value_kind == "string":
+            return Comparison(field, op, value[1:-1])
+        if value_kind == "word":
+            return Comparison(field, op, value)
+        raise ValueError(f"Expected a value after {field} {op}, got {value!r}")
+
+
+def parse(expression: str):
+    """
+    Parse a filter expression into a syntax tree.
+
+    Expressions are comparisons (`field op value`, with op one of
+    = != < <= > >=) combined with and/or/not and parentheses.
+
+    Raises:
+        ValueError: If the expression is malformed
+    """
+    return _Parser(expression).parse()
+
+
+def compile_predicate(node, target: str, service) -> Callable[[Any], bool]:
+    """
+    Compile a parsed expression into a predicate over entities of a target.
+
+    Raises:
+        ValueError: If the expression references unknown fields or mismatched types
+    """
+    fields = _FIELDS[target](service)
+
+    def build(node):
+        if isinstance(node, BoolOp):
+            parts = [build(operand) for operand in node.operands]
+            if node.op == "and":
+                return lambda entity: all(part(entity) for part in parts)
+            return lambda entity: any(part(entity) for part in parts)
+        if isinstance(node, Not):
+            inner = build(node.operand)
+            return lambda entity: not inner(entity)
+
+        if node.field not in fields:
+            raise ValueError(
+                f"Unknown field {node.field!r} for {target}; "
+                f"expected one of: {', '.join(sorted(fields))}"
+            )
+        kind, getter = fields[node.field]
+        if kind == "number" and not isinstance(node.value, float):
+            raise ValueError(f"Field {node.field!r} expects a number, got {node.value!r}")
+        if kind != "number":
+            node.value = str(node.value) if not isinstance(node.value, float) else f"{node.value:g}"
+            if kind == "code":
+                node.value = node.value.strip().upper()
+        compare = _OPERATORS[node.op]
+        value = node.value
+
+        def predicate(entity):
+            actual = getter(entity)
+            return actual is not None and compare(actual, value)
+        return predicate
+
+    return build(node)
+
+
+class QueryPlan:
+    """Chosen access path for a query plus the residual filter applied to candidates."""
+
+    def __init__(self, target: str, access: str, description: str,
+                 candidates: Callable[[], Iterable[Any]], node):
+        self.target = target
+        self.access = access
+        self.description = description
+        self._candidates = candidates
+        self.node = node
+        self.predicate: Callable[[Any], bool] = lambda entity: True
+
+    def explain(self) -> str:
+        """Return a human-readable description of the plan."""
+        return f"{self.description}; filter {self.node}"
+
+    def execute(self) -> Iterator[Any]:
+        """Yield the entities that satisfy the query."""
+        for entity in self._candidates():
+            if self.predicate(entity):
+                yield entity
+
+
+def _conjuncts(node) -> List[Any]:
+    """Top-level AND terms of an expression; anything under OR/NOT is opaque."""
+    if isinstance(node, BoolOp) and node.op == "and":
+        terms = []
+        for operand in node.operands:
+            terms.extend(_conjuncts(operand))
+        return terms
+    return [node]
+
+
+def _equality(terms: List[Any], field: str) -> Optional[Any]:
+    for term in terms:
+        if isinstance(term, Comparison) and term.field == field and term.op in ("=", "=="):
+            return term.value
+    return None
+
+
+def _average_bounds(terms: List[Any]) -> Tuple[Optional[Tuple[float, bool]], Optional[Tuple[float, bool]]]:
+    """Return the first lower and upper (value, inclusive) bounds on avg among the terms."""
+    low = high = None
+    for term in terms:
+        if not isinstance(term, Comparison) or term.field != "avg":
+            continue
+        if term.op in ("=", "==", ">", ">=") and low is None:
+            low = (term.value, term.op != ">")
+        if term.op in ("=", "==", "<", "<=") and high is None:
+            high = (term.value, term.op != "<")
+    return low, high
+
+
+def _single(entity) -> List[Any]:
+    return [entity] if entity is not None else []
+
+
+def plan(node, target: str, service) -> QueryPlan:
+    """
+    Choose the cheapest available access path for a compiled query.
+
+    Equality tests on keys use the service's point lookups, equality on a
+    student ID or course code uses its per-student/per-course lookups and
+    range tests on avg use the sorted-average lookup when the service has
+    already built one (building it costs more than a single scan). Anything
+    else falls back to a full scan.
+    """
+    terms = _conjuncts(node)
+
+    if target == "students":
+        student_id = _equality(terms, "id")
+        if student_id is not None:
+            return QueryPlan(target, "point", f"lookup student by id {student_id:g}",
+                             lambda: _single(service._find_student(int(student_id))), node)
+        return QueryPlan(target, "scan", "full scan of students",
+                         lambda: service.list_students(), node)
+
+    if target == "courses":
+        code = _equality(terms, "code")
+        if code is not None:
+            return QueryPlan(target, "point", f"lookup course by code {code!r}",
+                             lambda: _single(service._find_course(code)), node)
+        return QueryPlan(target, "scan", "full scan of courses",
+                         lambda: service.list_courses(), node)
+
+    student_id = _equality(terms, "student_id")
+    code = _equality(terms, "course_code")
+    if student_id is not None and code is not None:
+        return QueryPlan(target, "point",
+                         f"lookup enrollment by student id {student_id:g} and course code {code!r}",
+                         lambda: _single(service._find_enrollment(int(student_id), code)), node)
+    if student_id is not None:
+        return QueryPlan(target, "student", f"lookup enrollments by student id {student_id:g}",
+                         lambda: service._student_enrollments(int(student_id)), node)
+    if code is not None:
+        return QueryPlan(target, "course", f"lookup enrollments by course code {code!r}",
+                         lambda: service._course_enrollments(code), node)
+
+    low, high = _average_bounds(terms)
+    average_index = service.SORTED_AVERAGE_LOOKUP and service._average_index is not None
+    if (low or high) and average_index:
+        bounds = []
+        if low:
+            bounds.append(f"avg {'>=' if low[1] else '>'} {low[0]:g}")
+        if high:
+            bounds.append(f"avg {'<=' if high[1] else '<'} {high[0]:g}")
+        return QueryPlan(target, "average", f"range scan of sorted averages ({', '.join(bounds)})",
+                         lambda: service._enrollments_by_average(low, high), node)
+
+    description = "full scan of enrollments"
+    if (low or high) and service.SORTED_AVERAGE_LOOKUP:
+        description += " (sorted-average lookup not built)"
+    return QueryPlan(target, "scan", description,
+                     lambda: service.list_enrollments(), node)
+
+
+def build_plan(target: str, expression: str, service) -> QueryPlan:
+    """
+    Parse, compile and plan a filter expression against a service.
+
+    Args:
+        target: One of "students", "courses" or "enrollments"
+        expression: Filter expression
+        service: GradebookService providing the lookups
+
+    Returns:
+        Executable QueryPlan
+
+    Raises:
+        ValueError: If the target or expression is invalid
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown query target {target!r}; expected one of: {', '.join(TARGETS)}")
+    node = parse(expression)
+    # Compiling first normalises literal values (e.g. upper-cased course codes)
+    # before the planner inspects them.
+    predicate = compile_predicate(node, target, service)
+    query_plan = plan(node, target, service)
+    query_plan.predicate = predicate
+    return query_plan
@@ -1,16 +1,23 @@
 
-from typing import List, Dict, Any, Optional
+import bisect
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from .models import Student, Course, Enrollment
+from .cache import LRUCache
+from .storage import SqliteStore
+from .query import QueryPlan, build_plan
 
 
 class GradebookService:
     """Service class handling all different gradebook operations."""
     
+    SORTED_AVERAGE_LOOKUP = True
+    
     def __init__(self):
         self.students: List[Student] = []
         self.courses: List[Course] = []
         self.enrollments: List[Enrollment] = []
         self._next_student_id = 1
+        self._reindex()
     
     def load_from_dict(self, data: Dict[str, Any]):
         """Load data from dictionary."""
@@ -36,6 +43,7 @@ class GradebookService:
                 )
                 for enrollment_data in data.get('enrollments', [])
             ]
+            self._reindex()
             
             if self.students:
                 self._next_student_id = max(s.id for s in self.students) + 1
@@ -62,7 +70,7 @@ class GradebookService:
                     "course_code": e.course_code,
                     "grades": e.grades
                 }
-                for e in self.enrollments
+                for e in self.list_enrollments()
             ]
         }
     
@@ -85,6 +93,7 @@ class GradebookService:
         student_id = self._next_student_id
         student = Student(student_id, name)
         self.students.append(student)
+        self._students_by_id[student_id] = student
         self._next_student_id += 1
         return student_id
     
@@ -105,11 +114,12 @@ class GradebookService:
             raise ValueError("Course title cannot be empty")
         
         code = code.strip().upper()
-        if any(course.code == code for course in self.courses):
+        if code in self._courses_by_code:
             raise ValueError(f"Course with code {code} already exists")
         
         course = Course(code, title)
         self.courses.append(course)
+        self._courses_by_code[code] = course
     
     def enroll(self, student_id: int, course_code: str):
         """
@@ -130,12 +140,11 @@ class GradebookService:
         if not course:
             raise ValueError(f"Course with code {course_code} not found")
         
-        if any(e.student_id == student_id and e.course_code == course_code 
-               for e in self.enrollments):
+        if self._find_enrollment(student_id, course_code):
             raise ValueError(f"Student {student_id} is already enrolled in {course_code}")
         
         enrollment = Enrollment(student_id, course_code)
-        self.enrollments.append(enrollment)
+        self._add_enrollment(enrollment)
     
     def add_grade(self, student_id: int, course_code: str, grade: float):
         """
@@ -153,7 +162,11 @@ class GradebookService:
         if not enrollment:
             raise ValueError(f"Student {student_id} is not enrolled in {course_code}")
         
+        old_average = enrollment.get_average()
         enrollment.add_grade(grade)
+        if self._average_index is not None:
+            self._unindex_average(enrollment, old_average)
+            self._index_average(enrollment)
     
     def compute_average(self, student_id: int, course_code: str) -> float:
         """
@@ -192,8 +205,8 @@ class GradebookService:
             raise ValueError(f"Student with ID {student_id} not found")
         
         student_enrollments = [
-            e for e in self.enrollments 
-            if e.student_id == student_id and e.grades
+            e for e in self._student_enrollments(student_id)
+            if e.grades
         ]
         
         if not student_enrollments:
@@ -216,22 +229,265 @@ class GradebookService:
         else:  
             return sorted(self.courses, key=lambda c: c.code)
     
-    def list_enrollments(self) -> List[Enrollment]:
+    def list_enrollments(self) -> Iterable[Enrollment]:
         """List all enrollments."""
         return self.enrollments
     
+    def plan_query(self, target: str, expression: str) -> QueryPlan:
+        """
+        Compile a filter expression and choose how to evaluate it.
+        
+        Args:
+            target: "students", "courses" or "enrollments"
+            expression: Filter expression, e.g. "course_code = PY201 and avg < 60"
+            
+        Returns:
+            QueryPlan whose explain() describes the chosen lookup
+            
+        Raises:
+            ValueError: If the target or expression is invalid
+        """
+        return build_plan(target, expression, self)
+    
+    def query(self, target: str, expression: str) -> Iterator[Any]:
+        """
+        Find students, courses or enrollments matching a filter expression.
+        
+        Raises:
+            ValueError: If the target or expression is invalid
+        """
+        return self.plan_query(target, expression).execute()
+    
+    def build_average_index(self):
+        """
+        Build the sorted-average lookup used for avg range queries.
+        
+        Building costs a sort of all enrollments, so it is not done
+        implicitly; the query planner only uses the lookup once it exists.
+        Afterwards it is kept up to date as enrollments and grades are added.
+        
+        Raises:
+            ValueError: If the service does not support the lookup
+        """
+        if not self.SORTED_AVERAGE_LOOKUP:
+            raise ValueError("Sorted-average lookup is not available in this mode")
+        ordered = sorted(self.enrollments, key=lambda e: e.get_average())
+        self._average_index = ([e.get_average() for e in ordered], ordered)
+    
+    def _reindex(self):
+        """Rebuild the lookup tables from the student, course and enrollment lists."""
+        self._students_by_id: Dict[int, Student] = {s.id: s for s in self.students}
+        self._courses_by_code: Dict[str, Course] = {c.code: c for c in self.courses}
+        self._enrollments_by_key: Dict[Tuple[int, str], Enrollment] = {}
+        self._enrollments_by_student: Dict[int, List[Enrollment]] = {}
+        self._enrollments_by_course: Dict[str, List[Enrollment]] = {}
+        self._average_index: Optional[Tuple[List[float], List[Enrollment]]] = None
+        for enrollment in self.enrollments:
+            self._index_enrollment(enrollment)
+    
+    def _index_enrollment(self, enrollment: Enrollment):
+        """Add an enrollment to the lookup tables."""
+        self._enrollments_by_key[(enrollment.student_id, enrollment.course_code)] = enrollment
+        self._enrollments_by_student.setdefault(enrollment.student_id, []).append(enrollment)
+        self._enrollments_by_course.setdefault(enrollment.course_code, []).append(enrollment)
+        if self._average_index is not None:
+            self._index_average(enrollment)
+    
     def _find_student(self, student_id: int) -> Optional[Student]:
         """Find student by ID."""
-        return next((s for s in self.students if s.id == student_id), None)
+        return self._students_by_id.get(student_id)
     
     def _find_course(self, course_code: str) -> Optional[Course]:
         """Find course by code."""
-        return next((c for c in self.courses if c.code == course_code.upper()), None)
+        return self._courses_by_code.get(course_code.upper())
     
     def _find_enrollment(self, student_id: int, course_code: str) -> Optional[Enrollment]:
         """Find enrollment by student ID and course code."""
-        return next(
-            (e for e in self.enrollments 
-             if e.student_id == student_id and e.course_code == course_code.upper()),
-            None
-        )
\ No newline at end of file
+        return self._enrollments_by_key.get((student_id, course_code.upper()))
+    
+    def _student_enrollments(self, student_id: int) -> List[Enrollment]:
+        """Find all enrollments of a student."""
+        return list(self._enrollments_by_student.get(student_id, []))
+    
+    def _course_enrollments(self, course_code: str) -> List[Enrollment]:
+        """Find all enrollments in a course."""
+        return list(self._enrollments_by_course.get(course_code.upper(), []))
+    
+    def _enrollments_by_average(self, low: Optional[Tuple[float, bool]],
+                                high: Optional[Tuple[float, bool]]) -> List[Enrollment]:
+        """
+        Find enrollments whose average lies within the given bounds.
+        
+        Args:
+            low: (value, inclusive) lower bound, or None
+            high: (value, inclusive) upper bound, or None
+            
+        Returns:
+            Matching enrollments in ascending order of average
+        """
+        if self._average_index is None:
+            self.build_average_index()
+        averages, ordered = self._average_index
+        
+        start, end = 0, len(averages)
+        if low is not None:
+            start = (bisect.bisect_left if low[1] else bisect.bisect_right)(averages, low[0])
+        if high is not None:
+            end = (bisect.bisect_right if high[1] else bisect.bisect_left)(averages, high[0])
+        return ordered[start:end]
+    
+    def _index_average(self, enrollment: Enrollment):
+        """Insert an enrollment into the sorted-average lookup."""
+        averages, ordered = self._average_index
+        average = enrollment.get_average()
+        position = bisect.bisect_right(averages, average)
+        averages.insert(position, average)
+        ordered.insert(position, enrollment)
+    
+    def _unindex_average(self, enrollment: Enrollment, average: float):
+        """Remove an enrollment, filed under the given average, from the sorted-average lookup."""
+        averages, ordered = self._average_index
+        position = bisect.bisect_left(averages, average)
+        while ordered[position] is not enrollment:
+            position += 1
+        del averages[position]
+        del ordered[position]
+    
+    def _add_enrollment(self, enrollment: Enrollment):
+        """Register a new enrollment."""
+        self.enrollments.append(enrollment)
+        self._index_enrollment(enrollment)
+
+
+class BoundedGradebookService(GradebookService):
+    """
+    Memory-bounded gradebook service.
+    
+    Students and courses stay resident, while enrollments are fetched on
+    demand from a SqliteStore and kept in an LRU cache. Modified enrollments
+    are written back when evicted or on flush().
+    """
+    
+    DEFAULT_CACHE_ENTRIES = 10000
+    SORTED_AVERAGE_LOOKUP = False
+    
+    def __init__(self, store: SqliteStore, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        super().__init__()
+        if max_entries is None and max_bytes is None:
+            max_entries = self.DEFAULT_CACHE_ENTRIES
+        
+        self.store = store
+        self._cache = LRUCache(max_entries, max_bytes, on_evict=self._write_back)
+        self._dirty_students = set()
+        self._dirty_courses = set()
+        self._load_resident()
+    
+    def load_from_dict(self, data: Dict[str, Any]):
+        """Import data from dictionary into the backing store and reload."""
+        # Write back pending changes and drop cached enrollments first, so
+        # stale grade lists cannot later overwrite the imported rows.
+        self.flush()
+        self._cache.clear()
+        # import_data validates the whole payload before writing and rolls
+        # back on failure, so residents are only reloaded after a clean import.
+        self.store.import_data(data)
+        self._load_resident()
+    
+    def add_student(self, name: str) -> int:
+        """Add a new student, marking it for the next flush()."""
+        student_id = super().add_student(name)
+        self._dirty_students.add(student_id)
+        return student_id
+    
+    def add_course(self, code: str, title: str):
+        """Add a new course, marking it for the next flush()."""
+        super().add_course(code, title)
+        self._dirty_courses.add(code.strip().upper())
+    
+    def add_grade(self, student_id: int, course_code: str, grade: float):
+        """Add a grade for a student in a course, marking the enrollment dirty."""
+        super().add_grade(student_id, course_code, grade)
+        self._cache.mark_dirty((student_id, course_code.upper()))
+    
+    def list_enrollments(self) -> Iterable[Enrollment]:
+        """
+        Stream all enrollments from the backing store.
+        
+        Dirty cache entries are flushed first; the streamed objects are not
+        cached, so listing does not evict the working set.
+        """
+        self._flush_enrollments()
+        for student_id, course_code, grades in self.store.iter_enrollments():
+            yield Enrollment(student_id, course_code, grades)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction statistics of the enrollment cache."""
+        return self._cache.stats()
+    
+    def flush(self):
+        """Write back dirty enrollments, students and courses, then commit if anything changed."""
+        self._flush_enrollments()
+        for student_id in self._dirty_students:
+            student = self._find_student(student_id)
+            self.store.save_student(student.id, student.name)
+        for code in self._dirty_courses:
+            course = self._find_course(code)
+            self.store.save_course(course.code, course.title)
+        self._dirty_students.clear()
+        self._dirty_courses.clear()
+        if self.store.has_pending_writes:
+            self.store.commit()
+    
+    def _load_resident(self):
+        """Load students and courses from the backing store."""
+        self.students = [Student(s['id'], s['name']) for s in self.store.load_students()]
+        self.courses = [Course(c['code'], c['title']) for c in self.store.load_courses()]
+        self._reindex()
+        if self.students:
+            self._next_student_id = max(s.id for s in self.students) + 1
+    
+    def _flush_enrollments(self):
+        """Write back all dirty cached enrollments."""
+        for key, enrollment in self._cache.dirty_items():
+            self.store.save_grades(enrollment.student_id, enrollment.course_code, enrollment.grades)
+            self._cache.mark_clean(key)
+    
+    def _write_back(self, key: Tuple[int, str], enrollment: Enrollment):
+        """Persist an evicted dirty enrollment."""
+        self.store.save_grades(enrollment.student_id, enrollment.course_code, enrollment.grades)
+    
+    def _find_enrollment(self, student_id: int, course_code: str) -> Optional[Enrollment]:
+        """Find enrollment by student ID and course code, loading it on a cache miss."""
+        key = (student_id, course_code.upper())
+        enrollment = self._cache.get(key)
+        if enrollment is None:
+            grades = self.store.load_grades(*key)
+            if grades is None:
+                return None
+            enrollment = Enrollment(student_id, key[1], grades)
+            self._cache.put(key, enrollment)
+        return enrollment
+    
+    def _student_enrollments(self, student_id: int) -> List[Enrollment]:
+        """Find all enrollments of a student through the cache."""
+        enrollments = []
+        for code in self.store.course_codes_for_student(student_id):
+            enrollment = self._find_enrollment(student_id, code)
+            if enrollment is not None:
+                enrollments.append(enrollment)
+        return enrollments
+    
+    def _course_enrollments(self, course_code: str) -> List[Enrollment]:
+        """Find all enrollments in a course through the cache."""
+        enrollments = []
+        for student_id in self.store.student_ids_for_course(course_code.upper()):
+            enrollment = self._find_enrollment(student_id, course_code)
+            if enrollment is not None:
+                enrollments.append(enrollment)
+        return enrollments
+    
+    def _add_enrollment(self, enrollment: Enrollment):
+        """Register a new enrollment directly in the backing store."""
+        self.store.save_grades(enrollment.student_id, enrollment.course_code, enrollment.grades)
+        self._cache.put((enrollment.student_id, enrollment.course_code), enrollment)
@@ -1,8 +1,10 @@
 
 import json
 import logging
+import sqlite3
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from .models import Student, Course, Enrollment
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +65,164 @@ def save_data(data: Dict[str, Any], file_path: str = "data/gradebook.json") -> b
         return False
 
 
+class SqliteStore:
+    """
+    SQLite-backed gradebook store that can fetch single enrollments on demand.
+
+    Used by the memory-bounded service mode so that only the working set of
+    enrollments has to be held in memory.
+    """
+
+    def __init__(self, file_path: str = "data/gradebook.db"):
+        path = Path(file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file_path = file_path
+        self._conn = sqlite3.connect(str(path))
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS courses (
+                code TEXT PRIMARY KEY,
+                title TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS enrollments (
+                student_id INTEGER NOT NULL,
+                course_code TEXT NOT NULL,
+                grades TEXT NOT NULL,
+                PRIMARY KEY (student_id, course_code)
+            );
+            CREATE INDEX IF NOT EXISTS enrollments_by_course
+                ON enrollments (course_code);
+            """
+        )
+
+    def load_students(self) -> List[Dict[str, Any]]:
+        """Return all students as dictionaries ordered by ID."""
+        rows = self._conn.execute("SELECT id, name FROM students ORDER BY id")
+        return [{"id": row[0], "name": row[1]} for row in rows]
+
+    def load_courses(self) -> List[Dict[str, Any]]:
+        """Return all courses as dictionaries ordered by code."""
+        rows = self._conn.execute("SELECT code, title FROM courses ORDER BY code")
+        return [{"code": row[0], "title": row[1]} for row in rows]
+
+    def save_student(self, student_id: int, name: str):
+        """Insert or update a student."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO students (id, name) VALUES (?, ?)", (student_id, name)
+        )
+
+    def save_course(self, code: str, title: str):
+        """Insert or update a course."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO courses (code, title) VALUES (?, ?)", (code, title)
+        )
+
+    def load_grades(self, student_id: int, course_code: str) -> Optional[List[float]]:
+        """
+        Fetch the grade list of a single enrollment.
+
+        Returns:
+            List of grades, or None if the enrollment does not exist
+        """
+        row = self._conn.execute(
+            "SELECT grades FROM enrollments WHERE student_id = ? AND course_code = ?",
+            (student_id, course_code)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_grades(self, student_id: int, course_code: str, grades: List[float]):
+        """Insert or update the grade list of an enrollment."""
+        self._conn.execute(
+            "INSERT INTO enrollments (student_id, course_code, grades) VALUES (?, ?, ?) "
+            "ON CONFLICT (student_id, course_code) DO UPDATE SET grades = excluded.grades",
+            (student_id, course_code, json.dumps(grades))
+        )
+
+    def course_codes_for_student(self, student_id: int) -> List[str]:
+        """Return the codes of all courses a student is enrolled in."""
+        rows = self._conn.execute(
+            "SELECT course_code FROM enrollments WHERE student_id = ? ORDER BY course_code",
+            (student_id,)
+        )
+        return [row[0] for row in rows]
+
+    def student_ids_for_course(self, course_code: str) -> List[int]:
+        """Return the IDs of all students enrolled in a course."""
+        rows = self._conn.execute(
+            "SELECT student_id FROM enrollments WHERE course_code = ? ORDER BY student_id",
+            (course_code,)
+        )
+        return [row[0] for row in rows]
+
+    def iter_enrollments(self) -> Iterator[Tuple[int, str, List[float]]]:
+        """Stream (student_id, course_code, grades) rows without loading them all."""
+        cursor = self._conn.execute(
+            "SELECT student_id, course_code, grades FROM enrollments ORDER BY rowid"
+        )
+        for student_id, course_code, grades in cursor:
+            yield student_id, course_code, json.loads(grades)
+
+    def import_data(self, data: Dict[str, Any]):
+        """
+        Copy a gradebook dictionary (as produced by load_data) into the store.
+
+        The whole payload is validated and normalised through the models
+        before anything is written, and the import is committed as a single
+        transaction.
+
+        Raises:
+            ValueError: If the data is invalid; nothing is written in that case
+        """
+        try:
+            students = [
+                Student(student['id'], student['name'])
+                for student in data.get('students', [])
+            ]
+            courses = [
+                Course(course['code'], course['title'])
+                for course in data.get('courses', [])
+            ]
+            enrollments = []
+            for enrollment_data in data.get('enrollments', []):
+                enrollment = Enrollment(enrollment_data['student_id'], enrollment_data['course_code'])
+                for grade in enrollment_data.get('grades', []):
+                    enrollment.add_grade(grade)
+                enrollments.append(enrollment)
+        except Exception as e:
+            raise ValueError(f"Invalid data format: {e}")
+
+        try:
+            for student in students:
+                self.save_student(student.id, student.name)
+            for course in courses:
+                self.save_course(course.code, course.title)
+            for enrollment in enrollments:
+                self.save_grades(enrollment.student_id, enrollment.course_code, enrollment.grades)
+        except Exception:
+            self._conn.rollback()
+            raise
+        self.commit()
+        logger.info(f"Imported data into {self.file_path}")
+
+    @property
+    def has_pending_writes(self) -> bool:
+        """Whether there are writes that have not been committed yet."""
+        return self._conn.in_transaction
+
+    def commit(self):
+        """Commit pending writes to disk."""
+        self._conn.commit()
+
+    def close(self):
+        """Commit and close the underlying connection."""
+        self._conn.commit()
+        self._conn.close()
+
+
 def setup_logging():
     """Setup logging configuration."""
     log_path = Path("logs/app.log")
@@ -5,8 +5,9 @@ Gradebook CLI - Command-line interface for managing students, courses, and grade
 import argparse
 import sys
 import logging
-from gradebook.storage import load_data, save_data, setup_logging
-from gradebook.service import GradebookService
+from gradebook.storage import load_data, save_data, setup_logging, SqliteStore
+from gradebook.service import GradebookService, BoundedGradebookService
+from gradebook.export import export_grades, EXPORT_FORMATS
 
 
 def parse_grade(grade_str: str) -> float:
@@ -36,17 +37,14 @@ def main():
     setup_logging()
     logger = logging.getLogger(__name__)
     
-    # Load data and initialize service
-    try:
-        data = load_data()
-        service = GradebookService()
-        service.load_from_dict(data)
-    except Exception as e:
-        logger.error(f"Failed to initialize gradebook: {e}")
-        print(f"Error: Failed to initialize gradebook: {e}")
-        return 1
-    
     parser = argparse.ArgumentParser(description="Gradebook CLI")
+    parser.add_argument('--db', help='SQLite archive; enables memory-bounded mode')
+    parser.add_argument('--cache-entries', type=int,
+                        help='Max enrollments kept in memory in memory-bounded mode')
+    parser.add_argument('--cache-bytes', type=int,
+                        help='Max estimated bytes of enrollments kept in memory in memory-bounded mode')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='Print enrollment cache statistics (memory-bounded mode)')
     subparsers = parser.add_subparsers(dest='command', help='Command to execute')
     
     parser_add_student = subparsers.add_parser('add-student', help='Add a new student')
@@ -78,12 +76,45 @@ def main():
     parser_gpa = subparsers.add_parser('gpa', help='Compute GPA for student')
     parser_gpa.add_argument('--student-id', type=int, required=True, help='Student ID')
     
+    parser_query = subparsers.add_parser('query', help='Find students, courses or enrollments matching a filter')
+    parser_query.add_argument('type', choices=['students', 'courses', 'enrollments'],
+                              help='What to query')
+    parser_query.add_argument('expression',
+                              help='Filter, e.g. "course_code = PY201 and avg < 60" or "count < 3"')
+    parser_query.add_argument('--explain', action='store_true', help='Show the chosen query plan')
+    
+    parser_export = subparsers.add_parser('export', help='Export every grade as flat rows')
+    parser_export.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Output format')
+    parser_export.add_argument('--output', help='Output file (default: stdout)')
+    
+    parser_import = subparsers.add_parser('import', help='Import a JSON gradebook into the --db archive')
+    parser_import.add_argument('--json', default='data/gradebook.json', help='JSON file to import')
+    
     args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         return 0
     
+    if args.command == 'import' and not args.db:
+        print("Error: import requires --db")
+        return 1
+    
+    # Load data and initialize service
+    try:
+        if args.db:
+            service = BoundedGradebookService(
+                SqliteStore(args.db), args.cache_entries, args.cache_bytes
+            )
+        else:
+            data = load_data()
+            service = GradebookService()
+            service.load_from_dict(data)
+    except Exception as e:
+        logger.error(f"Failed to initialize gradebook: {e}")
+        print(f"Error: Failed to initialize gradebook: {e}")
+        return 1
+    
     try:
         if args.command == 'add-student':
             student_id = service.add_student(args.name)
@@ -122,13 +153,14 @@ def main():
                         print(f"  {course}")
                         
             elif args.type == 'enrollments':
-                enrollments = service.list_enrollments()
-                if not enrollments:
+                found = False
+                for enrollment in service.list_enrollments():
+                    if not found:
+                        print("Enrollments:")
+                        found = True
+                    print(f"  {enrollment}")
+                if not found:
                     print("No enrollments found")
-                else:
-                    print("Enrollments:")
-                    for enrollment in enrollments:
-                        print(f"  {enrollment}")
             
         elif args.command == 'avg':
             average = service.compute_average(args.student_id, args.course)
@@ -137,9 +169,41 @@ def main():
         elif args.command == 'gpa':
             gpa = service.compute_gpa(args.student_id)
             print(f"GPA for student {args.student_id}: {gpa:.2f}")
+            
+        elif args.command == 'query':
+            plan = service.plan_query(args.type, args.expression)
+            if args.explain:
+                print(f"Plan: {plan.explain()}")
+            matches = 0
+            for entity in plan.execute():
+                if not matches:
+                    print(f"{args.type.capitalize()}:")
+                matches += 1
+                print(f"  {entity}")
+            if not matches:
+                print(f"No {args.type} found")
+            
+        elif args.command == 'export':
+            count = export_grades(service, args.format, args.output)
+            if args.output:
+                print(f"Exported {count} rows to {args.output}")
+            
+        elif args.command == 'import':
+            service.load_from_dict(load_data(args.json))
+            print(f"Imported {args.json} into {args.db}")
         
         # Save data after successful operation
-        save_data(service.to_dict())
+        if args.db:
+            service.flush()
+            logger.info(f"Enrollment cache stats: {service.cache_stats()}")
+            if args.cache_stats:
+                stats = service.cache_stats()
+                # stderr keeps the stats out of exports streamed to stdout
+                print("Cache: " + ", ".join(f"{key}={value}" for key, value in stats.items()),
+                      file=sys.stderr)
+        elif args.command not in ('query', 'export'):
+            # Queries and exports do not change data, so the JSON file is not rewritten
+            save_data(service.to_dict())
         
     except ValueError as e:
         logger.error(f"Validation error in {args.command}: {e}")
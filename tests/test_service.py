@@ -5,7 +5,12 @@ import unittest
 import tempfile
 import json
 import os
-from gradebook.service import GradebookService
+import io
+import csv
+from gradebook.service import GradebookService, BoundedGradebookService
+from gradebook.storage import SqliteStore
+from gradebook.cache import LRUCache
+from gradebook.export import iter_grade_rows, write_csv, write_jsonl, export_grades
 
 
 class TestGradebookService(unittest.TestCase):
@@ -111,5 +116,253 @@ class TestGradebookService(unittest.TestCase):
             self.service.compute_gpa(student_id)
 
 
+
+class TestQuery(unittest.TestCase):
+    """Test cases for filter queries and the query planner."""
+    
+    def setUp(self):
+        """Set up a small gradebook to query."""
+        self.service = GradebookService()
+        for name in ("Alice", "Bob", "Carol"):
+            self.service.add_student(name)
+        self.service.add_course("PY201", "Python 2")
+        self.service.add_course("GIT101", "Git")
+        for student_id, code, grades in [(1, "PY201", [50, 55]), (2, "PY201", [90, 80, 85]),
+                                         (3, "GIT101", [70]), (1, "GIT101", [95, 85, 90])]:
+            self.service.enroll(student_id, code)
+            for grade in grades:
+                self.service.add_grade(student_id, code, grade)
+    
+    def test_course_lookup_with_average_filter(self):
+        """Test students in a course with an average below a threshold."""
+        plan = self.service.plan_query("enrollments", "course_code = py201 and avg < 60")
+        self.assertEqual(plan.access, "course")
+        results = list(plan.execute())
+        self.assertEqual([(e.student_id, e.course_code) for e in results], [(1, "PY201")])
+    
+    def test_count_aggregate_uses_full_scan(self):
+        """Test enrollments with fewer than 3 grades."""
+        plan = self.service.plan_query("enrollments", "count < 3")
+        self.assertEqual(plan.access, "scan")
+        self.assertEqual(len(list(plan.execute())), 2)
+    
+    def test_average_range_lookup(self):
+        """Test that avg ranges use the sorted average lookup only once built, and see new grades."""
+        self.assertEqual(self.service.plan_query("enrollments", "avg >= 85").access, "scan")
+        self.service.build_average_index()
+        
+        self.service.add_grade(3, "GIT101", 100)
+        self.service.add_student("Dan")
+        self.service.enroll(4, "GIT101")
+        self.service.add_grade(4, "GIT101", 88)
+        plan = self.service.plan_query("enrollments", "avg >= 85 and avg <= 90")
+        self.assertEqual(plan.access, "average")
+        results = sorted((e.student_id, e.course_code) for e in plan.execute())
+        self.assertEqual(results, [(1, "GIT101"), (2, "PY201"), (3, "GIT101"), (4, "GIT101")])
+        averages, ordered = self.service._average_index
+        self.assertEqual(averages, sorted(e.get_average() for e in self.service.enrollments))
+        self.assertEqual(averages, [e.get_average() for e in ordered])
+    
+    def test_or_and_student_queries(self):
+        """Test disjunctions and student-level aggregates."""
+        names = [s.name for s in self.service.query("students", "gpa > 80 or name = 'Alice'")]
+        self.assertEqual(names, ["Alice", "Bob"])
+        plan = self.service.plan_query("students", "id = 2")
+        self.assertEqual(plan.access, "point")
+        self.assertEqual([s.name for s in plan.execute()], ["Bob"])
+    
+    def test_invalid_query(self):
+        """Test that malformed queries raise ValueError."""
+        with self.assertRaises(ValueError):
+            self.service.plan_query("enrollments", "avg <")
+        with self.assertRaises(ValueError):
+            self.service.plan_query("enrollments", "grade > 50")
+        with self.assertRaises(ValueError):
+            self.service.plan_query("enrollments", "avg > high")
+        with self.assertRaises(ValueError):
+            self.service.plan_query("teachers", "id = 1")
+
+
+class TestExport(unittest.TestCase):
+    """Test cases for streaming grade exports."""
+    
+    def setUp(self):
+        """Set up a gradebook with a few grades."""
+        self.service = GradebookService()
+        student_id = self.service.add_student("Ada, \"The\" Countess")
+        self.service.add_course("CS101", "CS Intro")
+        self.service.add_course("MATH101", "Calculus")
+        self.service.enroll(student_id, "CS101")
+        self.service.enroll(student_id, "MATH101")
+        self.service.add_grade(student_id, "CS101", 80)
+        self.service.add_grade(student_id, "CS101", 90)
+    
+    def test_rows_join_students_and_courses(self):
+        """Test that one row is produced per grade with joined names."""
+        rows = list(iter_grade_rows(self.service))
+        self.assertEqual(rows, [
+            (1, 'Ada, "The" Countess', "CS101", "CS Intro", 80.0, 85.0),
+            (1, 'Ada, "The" Countess', "CS101", "CS Intro", 90.0, 85.0),
+        ])
+    
+    def test_csv_chunks_round_trip(self):
+        """Test CSV output with a chunk size smaller than a row."""
+        stream = io.StringIO()
+        count = write_csv(iter_grade_rows(self.service), stream, chunk_size=10)
+        self.assertEqual(count, 2)
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]["student_name"], 'Ada, "The" Countess')
+        self.assertEqual(float(rows[1]["grade"]), 90.0)
+    
+    def test_jsonl_chunks_round_trip(self):
+        """Test JSONL output with a chunk size smaller than a row."""
+        stream = io.StringIO()
+        write_jsonl(iter_grade_rows(self.service), stream, chunk_size=10)
+        rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([r["grade"] for r in rows], [80.0, 90.0])
+        self.assertEqual(rows[0]["course_average"], 85.0)
+    
+    def test_export_to_file(self):
+        """Test exporting to a file and rejecting unknown formats."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "out", "grades.csv")
+            self.assertEqual(export_grades(self.service, "csv", path), 2)
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(file.read().splitlines()), 3)
+        with self.assertRaises(ValueError):
+            export_grades(self.service, "xml")
+
+
+class TestBoundedGradebookService(unittest.TestCase):
+    """Test cases for the memory-bounded BoundedGradebookService."""
+    
+    def setUp(self):
+        """Set up a service over a fresh SQLite archive with a tiny cache."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "gradebook.db")
+        self.store = SqliteStore(self.db_path)
+        self.service = BoundedGradebookService(self.store, max_entries=2)
+    
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+    
+    def test_lru_evicts_least_recently_used(self):
+        """Test that the cache evicts in LRU order and writes back dirty entries."""
+        written = []
+        cache = LRUCache(max_entries=2, on_evict=lambda key, value: written.append(key))
+        cache.put("a", [1.0], dirty=True)
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+        
+        self.assertNotIn("b", cache)
+        cache.put("d", [4.0])
+        self.assertNotIn("a", cache)
+        self.assertEqual(written, ["a"])
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertEqual(cache.stats()["writebacks"], 1)
+    
+    def test_grades_survive_eviction(self):
+        """Test that grades of evicted enrollments are written back and reloaded."""
+        student_id = self.service.add_student("Eve Adams")
+        for code in ("CS101", "MATH101", "PHY101"):
+            self.service.add_course(code, code)
+            self.service.enroll(student_id, code)
+        
+        self.service.add_grade(student_id, "CS101", 70)
+        self.service.add_grade(student_id, "MATH101", 80)
+        self.service.add_grade(student_id, "PHY101", 90)
+        
+        self.assertLessEqual(self.service.cache_stats()["entries"], 2)
+        self.assertGreater(self.service.cache_stats()["evictions"], 0)
+        self.assertEqual(self.service.compute_average(student_id, "CS101"), 70.0)
+        self.assertEqual(self.service.compute_gpa(student_id), 80.0)
+    
+    def test_flush_persists_to_store(self):
+        """Test that flushed data is visible to a new service over the same archive."""
+        student_id = self.service.add_student("Frank Moore")
+        self.service.add_course("CS101", "CS Intro")
+        self.service.enroll(student_id, "CS101")
+        self.service.add_grade(student_id, "CS101", 88)
+        self.service.flush()
+        
+        reloaded = BoundedGradebookService(SqliteStore(self.db_path), max_entries=2)
+        self.assertEqual(len(reloaded.students), 1)
+        self.assertEqual(reloaded.compute_average(student_id, "CS101"), 88.0)
+        enrollments = list(reloaded.list_enrollments())
+        self.assertEqual(len(enrollments), 1)
+        self.assertEqual(enrollments[0].grades, [88.0])
+        reloaded.store.close()
+    
+    def test_flush_writes_only_changes(self):
+        """Test that a read-only flush leaves no pending writes and new rows are written."""
+        self.service.add_student("Hank Lee")
+        self.service.flush()
+        self.assertFalse(self.store.has_pending_writes)
+        
+        self.service.flush()
+        self.assertFalse(self.store.has_pending_writes)
+        self.assertEqual(len(self.store.load_students()), 1)
+    
+    def test_import_discards_cached_enrollments(self):
+        """Test that importing over cached, dirty enrollments keeps the imported grades."""
+        student_id = self.service.add_student("Ivy Chen")
+        self.service.add_course("CS101", "CS Intro")
+        self.service.enroll(student_id, "CS101")
+        self.service.add_grade(student_id, "CS101", 50)
+        
+        self.service.load_from_dict({
+            "students": [{"id": student_id, "name": "Ivy Chen"}],
+            "courses": [{"code": "CS101", "title": "CS Intro"}],
+            "enrollments": [{"student_id": student_id, "course_code": "CS101", "grades": [99]}],
+        })
+        self.service.flush()
+        self.assertEqual(self.store.load_grades(student_id, "CS101"), [99])
+        self.assertEqual(self.service.compute_average(student_id, "CS101"), 99.0)
+    
+    def test_import_normalises_and_validates(self):
+        """Test that imports normalise codes and reject invalid data without writing."""
+        self.service.load_from_dict({
+            "students": [{"id": 1, "name": " Jack Ryan "}],
+            "courses": [{"code": "cs101", "title": "CS Intro"}],
+            "enrollments": [{"student_id": 1, "course_code": "cs101", "grades": [80]}],
+        })
+        self.assertEqual(self.service.students[0].name, "Jack Ryan")
+        self.assertEqual(self.service.compute_average(1, "cs101"), 80.0)
+        with self.assertRaises(ValueError):
+            self.service.enroll(1, "CS101")
+        
+        for invalid in (
+            {"students": [{"id": 2, "name": "Kim"}, {"id": 3, "name": ""}]},
+            {"students": [{"id": 2, "name": "Kim"}],
+             "enrollments": [{"student_id": 1, "course_code": "CS101", "grades": [500]}]},
+            {"enrollments": [{"student_id": 1, "course_code": "CS101", "grades": ["abc"]}]},
+        ):
+            with self.assertRaises(ValueError):
+                self.service.load_from_dict(invalid)
+        
+        self.assertFalse(self.store.has_pending_writes)
+        self.assertEqual([s["id"] for s in self.store.load_students()], [1])
+        self.assertEqual(self.store.load_grades(1, "CS101"), [80.0])
+        reloaded = BoundedGradebookService(SqliteStore(self.db_path), max_entries=2)
+        self.assertEqual(len(reloaded.students), 1)
+        reloaded.store.close()
+    
+    def test_query_uses_store_lookups(self):
+        """Test that queries fall back to store lookups without an average index."""
+        student_id = self.service.add_student("Grace Hall")
+        for code in ("CS101", "MATH101"):
+            self.service.add_course(code, code)
+            self.service.enroll(student_id, code)
+            self.service.add_grade(student_id, code, 40)
+        
+        plan = self.service.plan_query("enrollments", "course_code = CS101 and avg < 60")
+        self.assertEqual(plan.access, "course")
+        self.assertEqual(len(list(plan.execute())), 1)
+        self.assertEqual(self.service.plan_query("enrollments", "avg < 60").access, "scan")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file